@@ -0,0 +1,7 @@
+import os
+
+# Earth Engine project ID
+GEE_PROJECT = "carbon-segment-466615-n9"
+
+# Redis instance backing the arq analysis queue
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379")
@@ -1,16 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from utils.earth_engine import initialize_earth_engine
+from arq import create_pool
+from arq.connections import RedisSettings
+from config import REDIS_URL
 from routers import aoi
 
-# Initialize Earth Engine with project ID
-GEE_PROJECT = "carbon-segment-466615-n9"
-initialize_earth_engine(GEE_PROJECT)
+# Earth Engine work runs in the arq worker (see worker.py); the API only
+# needs the Redis pool used to enqueue and poll analysis jobs
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.redis = await create_pool(RedisSettings.from_dsn(REDIS_URL))
+    yield
+    await app.state.redis.close()
 
 # Create FastAPI app
 app = FastAPI(
     title="AOI Mapper API",
-    description="API for analyzing Areas of Interest using Earth Engine"
+    description="API for analyzing Areas of Interest using Earth Engine",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -1,120 +1,88 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-import ee
-import math
+from fastapi import APIRouter, HTTPException, Path, Request, Response
+from arq.jobs import Job, JobStatus
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import asyncio
 import logging
-from utils.earth_engine import (
-    sentinel2_composite,
-    compute_mask_areas,
-    safe_vectorize
-)
+from utils.analysis import AnalysisError, InputModel
+from utils.tiles import TileIndex, encode_tile
 
 router = APIRouter(prefix="/api/aoi", tags=["AOI Mapper"])
 logger = logging.getLogger("aoi-mapper")
 
-class InputModel(BaseModel):
-    name: str
-    latitude: float
-    longitude: float
-    area_sq_m: float
+# Tile indexes of finished analyses and encoded tiles kept in memory so
+# panning over an AOI neither re-reads the (large) job result from Redis nor
+# reprojects its features for every tile
+_INDEX_CACHE_SIZE = 16
+_TILE_CACHE_SIZE = 1024
+_index_cache: "OrderedDict[str, TileIndex]" = OrderedDict()
+_tile_cache: "OrderedDict[Tuple, bytes]" = OrderedDict()
+
+def _cache_put(cache: OrderedDict, key: Any, value: Any, max_size: int) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > max_size:
+        cache.popitem(last=False)
+
+async def _job_result(request: Request, job_id: str) -> Optional[Dict[str, Any]]:
+    """Return the finished analysis for a job, or None while it is still queued/running."""
+    job = Job(job_id, request.app.state.redis)
+    status = await job.status()
+    if status == JobStatus.not_found:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    if status != JobStatus.complete:
+        return None
+
+    info = await job.result_info()
+    if info is None:
+        raise HTTPException(status_code=500, detail="Analysis job failed: no result stored")
+    if not info.success:
+        # arq stores the exception the job raised as its result
+        if isinstance(info.result, AnalysisError):
+            raise HTTPException(status_code=400, detail=str(info.result))
+        raise HTTPException(status_code=500, detail=f"Analysis job failed: {info.result}")
+    return info.result
 
 @router.post("/analyze")
-async def analyze_area(payload: InputModel):
-    """Analyze a single area of interest."""
-    try:
-        if payload.area_sq_m <= 0:
-            raise HTTPException(status_code=400, detail="area_sq_m must be > 0")
-
-        radius_m = math.sqrt(payload.area_sq_m / math.pi)
-        center = ee.Geometry.Point([payload.longitude, payload.latitude])
-        aoi = center.buffer(radius_m)
-
-        try:
-            img = sentinel2_composite(aoi, start_days=365)
-        except RuntimeError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-
-        ndvi = img.normalizedDifference(["B8", "B4"]).rename("NDVI")
-        ndwi = img.normalizedDifference(["B3", "B8"]).rename("NDWI")
-
-        ndwi_t = 0.3
-        ndvi_agri_t = 0.35
-        ndvi_forest_t = 0.6
-
-        water_mask = ndwi.gt(ndwi_t)
-        forest_mask = ndvi.gt(ndvi_forest_t)
-        agri_mask = ndvi.gt(ndvi_agri_t).And(forest_mask.Not()).And(
-            water_mask.Not()
-        )
-        combined = water_mask.add(forest_mask).add(agri_mask)
-        infra_mask = combined.eq(0)
-
-        areas = compute_mask_areas(water_mask, forest_mask, agri_mask, aoi)
-        total_area = areas["total_area"]
-        water_area = areas["water_area"]
-        forest_area = areas["forest_area"]
-        agri_area = areas["agri_area"]
-        infra_area = areas["infra_area"]
-
-        if total_area <= 0:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Computed AOI total area is zero for {payload.name}.",
-            )
-
-        def pct(x):
-            return round(100.0 * x / total_area, 4)
-
-        summary = {
-            "name": payload.name,
-            "input_area_sq_m": payload.area_sq_m,
-            "calculated_radius_m": radius_m,
-            "total_area_sq_m": total_area,
-            "agriculture_area_sq_m": agri_area,
-            "agriculture_pct": pct(agri_area),
-            "water_area_sq_m": water_area,
-            "water_pct": pct(water_area),
-            "forest_area_sq_m": forest_area,
-            "forest_pct": pct(forest_area),
-            "infrastructure_area_sq_m": infra_area,
-            "infrastructure_pct": pct(infra_area),
-            "latitude": payload.latitude,
-            "longitude": payload.longitude,
-        }
-
-        # Get GeoJSON for each layer
-        water_geo = safe_vectorize(water_mask, aoi, "water")
-        agri_geo = safe_vectorize(agri_mask, aoi, "agriculture")
-        forest_geo = safe_vectorize(forest_mask, aoi, "forest")
-        infra_geo = safe_vectorize(infra_mask, aoi, "infrastructure")
-
-        # Convert to array of layers with properties
-        layers = []
-        for geo, class_name in [
-            (water_geo, "water"),
-            (agri_geo, "agriculture"),
-            (forest_geo, "forest"),
-            (infra_geo, "infrastructure")
-        ]:
-            if geo and geo.get("features"):
-                for feature in geo["features"]:
-                    feature["properties"]["class"] = class_name
-                    layers.append(feature)
-
-        return {
-            "summary": summary,
-            "layers": layers
-        }
-
-    except HTTPException:
-        raise
-    except ee.EEException as e:
-        logger.exception("Earth Engine exception: %s", e)
-        raise HTTPException(
-            status_code=500, detail=f"Earth Engine error: {e}"
-        )
-    except Exception as e:
-        logger.exception("Unhandled exception in /analyze: %s", e)
-        raise HTTPException(
-            status_code=500, detail=f"Server error: {e}"
-        )
+async def analyze_area(payload: InputModel, request: Request):
+    """Queue analysis of a single area of interest and return its job ID."""
+    if payload.area_sq_m <= 0:
+        raise HTTPException(status_code=400, detail="area_sq_m must be > 0")
+    job = await request.app.state.redis.enqueue_job("run_analysis_job", payload.model_dump())
+    return {"job_id": job.job_id}
+
+@router.get("/analyze/result/{job_id}")
+async def analysis_result(job_id: str, request: Request):
+    """Poll a queued analysis; ``result`` holds the summary and layers once done."""
+    result = await _job_result(request, job_id)
+    if result is None:
+        return {"state": "pending"}
+    return {"state": "done", "result": result}
+
+@router.get("/analyze/result/{job_id}/tiles/{z}/{x}/{y}")
+async def analysis_tile(
+    job_id: str,
+    request: Request,
+    z: int = Path(..., ge=0, le=24),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+):
+    """Return one XYZ tile of a finished analysis as a Mapbox Vector Tile."""
+    key = (job_id, z, x, y)
+    if key in _tile_cache:
+        _tile_cache.move_to_end(key)
+        return Response(content=_tile_cache[key], media_type="application/x-protobuf")
+
+    index = _index_cache.get(job_id)
+    if index is None:
+        result = await _job_result(request, job_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} has not finished")
+        index = await asyncio.to_thread(TileIndex, result["layers"])
+        _cache_put(_index_cache, job_id, index, _INDEX_CACHE_SIZE)
+    else:
+        _index_cache.move_to_end(job_id)
+
+    tile = await asyncio.to_thread(encode_tile, index, z, x, y)
+    _cache_put(_tile_cache, key, tile, _TILE_CACHE_SIZE)
+    return Response(content=tile, media_type="application/x-protobuf")
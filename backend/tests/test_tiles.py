@@ -0,0 +1,72 @@
+import mapbox_vector_tile
+import pytest
+from utils.geometry import quantize_geometry
+from utils.tiles import TileIndex, encode_tile, tile_bounds
+
+HALF_WORLD = 20037508.342789244
+
+def _square(lon, lat, size, label):
+    ring = [
+        [lon, lat],
+        [lon + size, lat],
+        [lon + size, lat + size],
+        [lon, lat + size],
+        [lon, lat],
+    ]
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Polygon", "coordinates": [ring]},
+        "properties": {"class": label},
+    }
+
+def test_tile_bounds_world():
+    assert tile_bounds(0, 0, 0) == pytest.approx(
+        (-HALF_WORLD, -HALF_WORLD, HALF_WORLD, HALF_WORLD)
+    )
+
+def test_tile_bounds_y_counts_down_from_north():
+    assert tile_bounds(1, 0, 0) == pytest.approx((-HALF_WORLD, 0.0, 0.0, HALF_WORLD))
+    assert tile_bounds(1, 1, 1) == pytest.approx((0.0, -HALF_WORLD, HALF_WORLD, 0.0))
+
+def test_encode_tile_places_features_in_the_northern_tile():
+    index = TileIndex([_square(-90.0, 45.0, 1.0, "water")])
+    assert "water" in mapbox_vector_tile.decode(encode_tile(index, 1, 0, 0))
+    assert mapbox_vector_tile.decode(encode_tile(index, 1, 0, 1)) == {}
+
+def test_encode_tile_one_layer_per_class():
+    index = TileIndex([
+        _square(-90.0, 45.0, 1.0, "water"),
+        _square(-80.0, 45.0, 1.0, "forest"),
+        _square(-70.0, 45.0, 1.0, "forest"),
+    ])
+    layers = mapbox_vector_tile.decode(encode_tile(index, 1, 0, 0))
+    assert set(layers) == {"water", "forest"}
+    assert len(layers["water"]["features"]) == 1
+    assert len(layers["forest"]["features"]) == 2
+    assert layers["forest"]["features"][0]["properties"] == {"class": "forest"}
+
+def test_encode_tile_empty_index():
+    assert mapbox_vector_tile.decode(encode_tile(TileIndex([]), 0, 0, 0)) == {}
+
+def test_encode_tile_drops_polygons_that_only_touch_the_tile():
+    # Shares only the lon=0 edge with the western z=1 tiles
+    index = TileIndex([_square(0.0, 10.0, 1.0, "agriculture")])
+    assert mapbox_vector_tile.decode(encode_tile(index, 1, 0, 0)) == {}
+    assert "agriculture" in mapbox_vector_tile.decode(encode_tile(index, 1, 1, 0))
+
+def test_quantize_geometry_rounds_in_place():
+    geometry = {
+        "type": "Polygon",
+        "coordinates": [[[1.23456789, 2.0], [3.0, 4.987654321], [1.23456789, 2.0]]],
+    }
+    assert quantize_geometry(geometry) is geometry
+    assert geometry["coordinates"] == [[[1.234568, 2.0], [3.0, 4.987654], [1.234568, 2.0]]]
+
+def test_quantize_geometry_collection_and_empty():
+    collection = {
+        "type": "GeometryCollection",
+        "geometries": [{"type": "Point", "coordinates": [0.1234567, 0.7654321]}],
+    }
+    quantize_geometry(collection, ndigits=3)
+    assert collection["geometries"][0]["coordinates"] == [0.123, 0.765]
+    assert quantize_geometry(None) is None
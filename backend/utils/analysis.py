@@ -0,0 +1,126 @@
+from pydantic import BaseModel
+import ee
+import math
+import asyncio
+from typing import Dict, Any
+from utils.earth_engine import (
+    sentinel2_composite,
+    compute_mask_areas,
+    safe_vectorize,
+    utm_projection
+)
+from utils.geometry import quantize_geometry
+
+class AnalysisError(Exception):
+    """The AOI cannot be analyzed as requested (bad input or no imagery)."""
+
+class InputModel(BaseModel):
+    name: str
+    latitude: float
+    longitude: float
+    area_sq_m: float
+
+async def _analyze(payload: InputModel) -> Dict[str, Any]:
+    """Run the Earth Engine classification and vectorization for one AOI."""
+    if payload.area_sq_m <= 0:
+        raise AnalysisError("area_sq_m must be > 0")
+
+    radius_m = math.sqrt(payload.area_sq_m / math.pi)
+    center = ee.Geometry.Point([payload.longitude, payload.latitude])
+    aoi = center.buffer(radius_m)
+
+    start_days = 365
+    img = sentinel2_composite(
+        aoi, payload.latitude, payload.longitude, radius_m, start_days=start_days
+    )
+
+    ndwi_t = 0.3
+    ndvi_agri_t = 0.35
+    ndvi_forest_t = 0.6
+
+    # One-pass classification: 1 water, 2 forest, 3 agriculture, 4 infrastructure
+    cls = img.expression(
+        "ndwi > W ? 1 : (ndvi > F ? 2 : (ndvi > A ? 3 : 4))",
+        {
+            "ndvi": img.normalizedDifference(["B8", "B4"]),
+            "ndwi": img.normalizedDifference(["B3", "B8"]),
+            "W": ndwi_t,
+            "F": ndvi_forest_t,
+            "A": ndvi_agri_t,
+        },
+    ).rename("class")
+
+    water_mask = cls.eq(1)
+    forest_mask = cls.eq(2)
+    agri_mask = cls.eq(3)
+    infra_mask = cls.eq(4)
+
+    areas = await compute_mask_areas(cls, aoi, img.get("image_count"))
+    if areas["image_count"] == 0:
+        raise AnalysisError(
+            f"No Sentinel-2 images found for AOI/date range (last {start_days} days)."
+        )
+
+    total_area = areas["total_area"]
+    water_area = areas["water_area"]
+    forest_area = areas["forest_area"]
+    agri_area = areas["agri_area"]
+    infra_area = areas["infra_area"]
+
+    if total_area <= 0:
+        raise AnalysisError(f"Computed AOI total area is zero for {payload.name}.")
+
+    def pct(x):
+        return round(100.0 * x / total_area, 4)
+
+    summary = {
+        "name": payload.name,
+        "input_area_sq_m": payload.area_sq_m,
+        "calculated_radius_m": radius_m,
+        "total_area_sq_m": total_area,
+        "agriculture_area_sq_m": agri_area,
+        "agriculture_pct": pct(agri_area),
+        "water_area_sq_m": water_area,
+        "water_pct": pct(water_area),
+        "forest_area_sq_m": forest_area,
+        "forest_pct": pct(forest_area),
+        "infrastructure_area_sq_m": infra_area,
+        "infrastructure_pct": pct(infra_area),
+        "latitude": payload.latitude,
+        "longitude": payload.longitude,
+    }
+
+    # Get GeoJSON for each layer; the EE round-trips are independent,
+    # so run them concurrently in worker threads
+    targets = [
+        (water_mask, "water", water_area),
+        (agri_mask, "agriculture", agri_area),
+        (forest_mask, "forest", forest_area),
+        (infra_mask, "infrastructure", infra_area),
+    ]
+    proj = utm_projection(payload.latitude, payload.longitude)
+
+    def collect(mask, label, known_area):
+        # Drain the streamed features inside the worker thread; the "class"
+        # property is already set on the Earth Engine side
+        features = list(safe_vectorize(mask, aoi, label, known_area, radius_m, proj))
+        for feature in features:
+            quantize_geometry(feature.get("geometry"))
+        return features
+
+    features_by_label = await asyncio.gather(
+        *(
+            asyncio.to_thread(collect, mask, label, known_area)
+            for mask, label, known_area in targets
+        )
+    )
+    layers = [f for features in features_by_label for f in features]
+
+    return {
+        "summary": summary,
+        "layers": layers
+    }
+
+async def run_analysis(payload_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Analyze a single area of interest; runs inside the arq worker."""
+    return await _analyze(InputModel(**payload_dict))
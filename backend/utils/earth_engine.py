@@ -1,79 +1,193 @@
 import ee
+import asyncio
 import datetime
+import functools
 import logging
-from typing import Dict, Any
+import threading
+import httplib2
+import ijson
+import requests
+from typing import Dict, Any, Iterator, Optional, Tuple
 
 logger = logging.getLogger("aoi-mapper")
 
+async def _eval(obj: Any) -> Any:
+    """Evaluate an Earth Engine object without blocking the event loop."""
+    return await asyncio.to_thread(obj.getInfo)
+
+class _ThreadLocalHttp:
+    """httplib2.Http stand-in that keeps one keep-alive client per thread.
+
+    A single ``httplib2.Http`` is not thread-safe, and EE calls now run on
+    worker threads, so each thread reuses its own persistent connection.
+    """
+
+    def __init__(self, timeout: Optional[int] = None):
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _http(self) -> httplib2.Http:
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = httplib2.Http(cache=None, timeout=self.timeout)
+            self._local.http = http
+        return http
+
+    def request(self, *args, **kwargs):
+        return self._http().request(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._http(), name)
+
+# No socket read timeout, as with EE's default transport: a large grouped
+# reduceRegion can stay silent for longer than any fixed limit, and a timeout
+# only makes googleapiclient retry the whole computation
+_HTTP_TRANSPORT = _ThreadLocalHttp()
+
 def initialize_earth_engine(project_id: str = None):
     """Initialize Earth Engine with optional project ID."""
     try:
         if project_id:
-            ee.Initialize(project=project_id)
+            ee.Initialize(http_transport=_HTTP_TRANSPORT, project=project_id)
         else:
-            ee.Initialize()
+            ee.Initialize(http_transport=_HTTP_TRANSPORT)
         logger.info("Initialized Earth Engine.")
     except Exception as e:
         logger.info("Earth Engine not initialized, attempting Authenticate() -> Initialize()")
         ee.Authenticate()
         if project_id:
-            ee.Initialize(project=project_id)
+            ee.Initialize(http_transport=_HTTP_TRANSPORT, project=project_id)
         else:
-            ee.Initialize()
+            ee.Initialize(http_transport=_HTTP_TRANSPORT)
+
+S2_COLLECTION_ID = "COPERNICUS/S2_SR_HARMONIZED"
+S2_CLOUD_PROBABILITY_ID = "COPERNICUS/S2_CLOUD_PROBABILITY"
+MAX_CLOUDY_PIXEL_PERCENTAGE = 40
+MAX_CLOUD_PROBABILITY = 40
 
 def mask_s2_clouds(img: ee.Image) -> ee.Image:
-    """Mask clouds in Sentinel-2 imagery."""
-    qa = img.select("QA60")
-    cloud_bit_mask = 1 << 10
-    cirrus_bit_mask = 1 << 11
-    mask = qa.bitwiseAnd(cloud_bit_mask).eq(0).And(
-        qa.bitwiseAnd(cirrus_bit_mask).eq(0)
+    """Mask clouds using the joined s2cloudless ``cloud_probability`` image."""
+    prob = ee.Image(img.get("cloud_probability")).select("probability")
+    return img.updateMask(prob.lt(MAX_CLOUD_PROBABILITY))
+
+@functools.lru_cache(maxsize=None)
+def _base_collection() -> ee.ImageCollection:
+    """Request-independent part of the Sentinel-2 collection graph.
+
+    Built lazily because ee objects cannot be created before ``ee.Initialize``.
+    """
+    return ee.ImageCollection(S2_COLLECTION_ID).filter(
+        ee.Filter.lt("CLOUDY_PIXEL_PERCENTAGE", MAX_CLOUDY_PIXEL_PERCENTAGE)
     )
-    return img.updateMask(mask).copyProperties(img, img.propertyNames())
-
-def sentinel2_composite(aoi: ee.Geometry, start_days: int = 365) -> ee.Image:
-    """Create a Sentinel-2 composite for the given area."""
-    now_dt = datetime.datetime.utcnow()
-    end = ee.Date(now_dt)
-    start = end.advance(-int(start_days), "day")
-
-    collection_id = "COPERNICUS/S2_SR_HARMONIZED"
-    col = (
-        ee.ImageCollection(collection_id)
-        .filterBounds(aoi)
+
+@functools.lru_cache(maxsize=None)
+def _pixel_area() -> ee.Image:
+    """Shared ``ee.Image.pixelArea()`` node, built once after initialization."""
+    return ee.Image.pixelArea()
+
+@functools.lru_cache(maxsize=64)
+def _date_window(day_bucket: int, start_days: int) -> Tuple[ee.Date, ee.Date]:
+    """Return the (start, end) dates for a weekly bucket."""
+    end_date = datetime.date.fromordinal((day_bucket + 1) * 7)
+    end = ee.Date(end_date.isoformat())
+    return end.advance(-int(start_days), "day"), end
+
+@functools.lru_cache(maxsize=256)
+def _sentinel2_composite_cached(
+    lat_rounded: float,
+    lon_rounded: float,
+    radius_bucket: int,
+    day_bucket: int,
+    start_days: int,
+) -> ee.Image:
+    """Build the unclipped median composite for a coarse spatial/temporal bucket."""
+    start, end = _date_window(day_bucket, start_days)
+    # Pad the search region so rounding the bucket never drops edge scenes
+    region = ee.Geometry.Point([lon_rounded, lat_rounded]).buffer(radius_bucket + 200)
+
+    scenes = _base_collection().filterBounds(region).filterDate(start, end)
+    probabilities = (
+        ee.ImageCollection(S2_CLOUD_PROBABILITY_ID)
+        .filterBounds(region)
         .filterDate(start, end)
-        .filter(ee.Filter.lt("CLOUDY_PIXEL_PERCENTAGE", 40))
-        .map(mask_s2_clouds)
     )
+    # Attach each scene's cloud probability image; unmatched scenes are dropped
+    joined = ee.Join.saveFirst("cloud_probability").apply(
+        primary=scenes,
+        secondary=probabilities,
+        condition=ee.Filter.equals(
+            leftField="system:index", rightField="system:index"
+        ),
+    )
+    col = ee.ImageCollection(joined).map(mask_s2_clouds)
 
-    col_size = col.size().getInfo()
-    if col_size == 0:
-        raise RuntimeError(
-            f"No Sentinel-2 images found for AOI/date range (last {start_days} days)."
-        )
+    # Keep the empty check server-side: an empty collection yields a blank
+    # image and the count is read back together with the mask areas
+    col_size = col.size()
+    empty = ee.Image.constant([0, 0, 0]).rename(["B3", "B4", "B8"])
+    img = ee.Image(ee.Algorithms.If(col_size.gt(0), col.median(), empty))
+    return img.set("image_count", col_size)
 
-    img = col.median().clip(aoi)
-    return img
+def sentinel2_composite(
+    aoi: ee.Geometry,
+    latitude: float,
+    longitude: float,
+    radius_m: float,
+    start_days: int = 365,
+) -> ee.Image:
+    """Create a Sentinel-2 composite for the given area.
 
-def compute_mask_areas(
-    water_mask: ee.Image, 
-    forest_mask: ee.Image, 
-    agri_mask: ee.Image, 
-    aoi: ee.Geometry
+    Composites are cached per ~100 m location, 100 m radius and calendar week.
+    The number of source scenes is stored in the ``image_count`` property.
+    """
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    day_bucket = today.toordinal() // 7
+    composite = _sentinel2_composite_cached(
+        round(latitude, 3),
+        round(longitude, 3),
+        int(round(radius_m / 100.0)) * 100,
+        day_bucket,
+        int(start_days),
+    )
+    return composite.clip(aoi)
+
+def utm_projection(latitude: float, longitude: float) -> ee.Projection:
+    """Return the UTM zone projection (metre units) containing the given point."""
+    zone = int((longitude + 180.0) // 6) % 60 + 1
+    epsg = (32600 if latitude >= 0 else 32700) + zone
+    return ee.Projection(f"EPSG:{epsg}")
+
+async def compute_mask_areas(
+    cls: ee.Image,
+    aoi: ee.Geometry,
+    image_count: ee.Number
 ) -> Dict[str, float]:
-    """Compute areas for each land cover type."""
-    def area_sum(mask_img: ee.Image, scale: int = 10) -> float:
-        pixel_area = ee.Image.pixelArea()
-        s = pixel_area.updateMask(mask_img).reduceRegion(
-            reducer=ee.Reducer.sum(), geometry=aoi, scale=scale, maxPixels=1e13
-        )
-        v = s.getInfo().get("area", 0.0)
-        return float(v or 0.0)
-
-    water_area = area_sum(water_mask)
-    forest_area = area_sum(forest_mask)
-    agri_area = area_sum(agri_mask)
-    total_area = float(aoi.area(1).getInfo() or 0.0)
+    """Compute areas for each land cover type in a single Earth Engine round-trip.
+
+    ``cls`` is the classification image (1 water, 2 forest, 3 agriculture,
+    4 infrastructure); all classes are summed in one grouped reduction.
+    ``image_count`` (the composite's scene count) is fetched in the same call.
+    """
+    grouped = _pixel_area().addBands(cls.toInt()).reduceRegion(
+        reducer=ee.Reducer.sum().group(groupField=1, groupName="class"),
+        geometry=aoi,
+        scale=10,
+        maxPixels=1e13,
+    )
+    result = await _eval(
+        ee.Dictionary(grouped)
+        .set("total", aoi.area(1))
+        .set("image_count", image_count)
+    )
+
+    class_areas = {
+        int(group["class"]): float(group.get("sum") or 0.0)
+        for group in result.get("groups") or []
+    }
+    water_area = class_areas.get(1, 0.0)
+    forest_area = class_areas.get(2, 0.0)
+    agri_area = class_areas.get(3, 0.0)
+    total_area = float(result.get("total") or 0.0)
     infra_area = max(total_area - (water_area + forest_area + agri_area), 0.0)
 
     return {
@@ -82,39 +196,67 @@ def compute_mask_areas(
         "agri_area": agri_area,
         "infra_area": infra_area,
         "total_area": total_area,
+        "image_count": int(result.get("image_count") or 0),
     }
 
-def safe_vectorize(mask_img: ee.Image, aoi: ee.Geometry, label: str) -> Dict[str, Any]:
-    """Safely convert a mask to vector format."""
-    pixel_area = ee.Image.pixelArea()
-    s = pixel_area.updateMask(mask_img).reduceRegion(
-        reducer=ee.Reducer.sum(), geometry=aoi, scale=10, maxPixels=1e13
-    )
-    area_val = 0.0
-    try:
-        area_val = float(s.getInfo().get("area", 0.0) or 0.0)
-    except Exception:
-        area_val = 0.0
+def safe_vectorize(
+    mask_img: ee.Image,
+    aoi: ee.Geometry,
+    label: str,
+    known_area: float,
+    radius_m: float,
+    proj: ee.Projection,
+) -> Iterator[Dict[str, Any]]:
+    """Safely convert a mask to vector format, yielding GeoJSON features.
+
+    ``known_area`` (from ``compute_mask_areas``) lets empty masks skip the
+    Earth Engine call; features are streamed from the GeoJSON download.
+    """
+    if known_area <= 0.0:
+        return
 
-    if area_val <= 0.0:
-        return {"type": "FeatureCollection", "features": []}
+    # Coarsen the vectorization grid and spread tiles over more EE workers as
+    # the AOI grows, instead of letting bestEffort downsample unpredictably
+    scale = max(10, int(radius_m / 500))
+    tile_scale = min(16, max(2, int((radius_m / 5000) ** 2)))
 
+    # Vectorize directly in the metre-based UTM projection so simplification
+    # and area work in the geometries' own projection
     vec = mask_img.selfMask().reduceToVectors(
         geometry=aoi,
-        scale=10,
+        crs=proj,
+        scale=scale,
         geometryType="polygon",
         labelProperty="label",
         maxPixels=1e13,
-        bestEffort=True,
+        tileScale=tile_scale,
+        bestEffort=False,
     )
 
+    tolerance = radius_m / 200.0
+    vec = vec.map(lambda f: f.simplify(maxError=tolerance))
+
     def _set_props(f):
-        return f.set({"class": label, "area_sq_m": f.geometry().area(1)})
+        return f.set({
+            "class": label,
+            "area_sq_m": f.geometry().area(maxError=1, proj=proj),
+        })
 
     vec = vec.map(_set_props)
+    # Drop speckle polygons; they add payload without being visible at AOI scale
+    vec = vec.filter(ee.Filter.gt("area_sq_m", radius_m))
 
+    streamed = False
     try:
-        return ee.FeatureCollection(vec).getInfo()
+        url = ee.FeatureCollection(vec).getDownloadURL(filetype="geojson")
+        with requests.get(url, stream=True, timeout=300) as r:
+            r.raise_for_status()
+            r.raw.decode_content = True
+            for feature in ijson.items(r.raw, "features.item", use_float=True):
+                streamed = True
+                yield feature
     except Exception as e:
-        logger.exception("reduceToVectors/getInfo failed for label=%s: %s", label, e)
-        return {"type": "FeatureCollection", "features": []}
+        logger.exception("reduceToVectors/download failed for label=%s: %s", label, e)
+        if streamed:
+            # A partial layer would look complete to the caller; fail instead
+            raise
@@ -0,0 +1,22 @@
+import numpy as np
+from typing import Dict, Any, List
+
+def _round_coordinates(coords: List[Any], ndigits: int) -> List[Any]:
+    """Round a (nested) GeoJSON coordinate array, one numpy call per ring."""
+    if not coords:
+        return coords
+    first = coords[0]
+    if isinstance(first, (int, float)) or isinstance(first[0], (int, float)):
+        return np.round(np.asarray(coords, dtype=np.float64), ndigits).tolist()
+    return [_round_coordinates(c, ndigits) for c in coords]
+
+def quantize_geometry(geometry: Dict[str, Any], ndigits: int = 6) -> Dict[str, Any]:
+    """Round GeoJSON coordinates in place (6 decimals is ~10 cm)."""
+    if not geometry:
+        return geometry
+    if geometry.get("type") == "GeometryCollection":
+        for part in geometry.get("geometries") or []:
+            quantize_geometry(part, ndigits)
+    elif "coordinates" in geometry:
+        geometry["coordinates"] = _round_coordinates(geometry["coordinates"], ndigits)
+    return geometry
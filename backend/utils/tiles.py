@@ -0,0 +1,74 @@
+import mapbox_vector_tile
+import numpy as np
+import shapely
+from shapely.geometry import MultiPolygon, box, shape
+from typing import Dict, Any, List, Tuple
+
+# Half the width of the Web Mercator world, in metres
+_ORIGIN_SHIFT = 20037508.342789244
+# Latitude limit of the square Web Mercator world
+_MAX_LATITUDE = 85.0511287798
+TILE_EXTENT = 4096
+
+def _to_web_mercator(coords: np.ndarray) -> np.ndarray:
+    lon = coords[:, 0]
+    lat = np.clip(coords[:, 1], -_MAX_LATITUDE, _MAX_LATITUDE)
+    mx = lon * _ORIGIN_SHIFT / 180.0
+    my = np.log(np.tan((90.0 + lat) * np.pi / 360.0)) * _ORIGIN_SHIFT / np.pi
+    return np.column_stack([mx, my])
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Return the Web Mercator bounds (minx, miny, maxx, maxy) of an XYZ tile."""
+    size = 2 * _ORIGIN_SHIFT / (2 ** z)
+    minx = -_ORIGIN_SHIFT + x * size
+    maxy = _ORIGIN_SHIFT - y * size
+    return minx, maxy - size, minx + size, maxy
+
+def _polygonal_part(geom):
+    """Keep only the polygons of a clip result; edge-touching lines/points drop out."""
+    polygons = []
+    for part in shapely.get_parts(geom):
+        if part.geom_type == "Polygon":
+            polygons.append(part)
+        elif part.geom_type == "MultiPolygon":
+            polygons.extend(part.geoms)
+    if not polygons:
+        return None
+    return polygons[0] if len(polygons) == 1 else MultiPolygon(polygons)
+
+class TileIndex:
+    """Features of one analysis reprojected to Web Mercator, with a spatial index.
+
+    Built once per analysis so each tile only touches the features it overlaps.
+    """
+
+    def __init__(self, features: List[Dict[str, Any]]):
+        geometries = []
+        for feature in features:
+            geom = shapely.transform(shape(feature["geometry"]), _to_web_mercator)
+            if not geom.is_valid:
+                geom = geom.buffer(0)
+            geometries.append(geom)
+        self.geometries = geometries
+        self.properties = [feature.get("properties") or {} for feature in features]
+        self.tree = shapely.STRtree(geometries)
+
+def encode_tile(index: TileIndex, z: int, x: int, y: int) -> bytes:
+    """Encode the indexed features as a Mapbox Vector Tile, one layer per class."""
+    bounds = tile_bounds(z, x, y)
+    tile_box = box(*bounds)
+
+    layers: Dict[str, List[Dict[str, Any]]] = {}
+    for i in sorted(index.tree.query(tile_box, predicate="intersects")):
+        clipped = _polygonal_part(index.geometries[i].intersection(tile_box))
+        if clipped is None:
+            continue
+        properties = index.properties[i]
+        layers.setdefault(properties.get("class", "unknown"), []).append(
+            {"geometry": clipped, "properties": properties}
+        )
+
+    return mapbox_vector_tile.encode(
+        [{"name": name, "features": feats} for name, feats in layers.items()],
+        default_options={"quantize_bounds": bounds, "extents": TILE_EXTENT},
+    )
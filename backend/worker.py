@@ -0,0 +1,19 @@
+from arq.connections import RedisSettings
+from typing import Dict, Any
+from config import GEE_PROJECT, REDIS_URL
+from utils.earth_engine import initialize_earth_engine
+from utils.analysis import run_analysis
+
+async def run_analysis_job(ctx: Dict[str, Any], payload_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """arq task wrapping ``run_analysis``; failures are stored as the job result."""
+    return await run_analysis(payload_dict)
+
+async def startup(ctx: Dict[str, Any]) -> None:
+    initialize_earth_engine(GEE_PROJECT)
+
+# Run with: arq worker.WorkerSettings
+class WorkerSettings:
+    functions = [run_analysis_job]
+    on_startup = startup
+    redis_settings = RedisSettings.from_dsn(REDIS_URL)
+    job_timeout = 600
@@ -46,6 +46,26 @@ function getLayerColor(layerClass) {
       return '#000000';
   }
 }
+// Poll a queued analysis job until the backend reports it as done; give up a
+// little after the worker's 600 s job timeout
+async function waitForAnalysis(
+  apiEndpoint,
+  jobId,
+  headers,
+  intervalMs = 2000,
+  maxWaitMs = 660000
+) {
+  const deadline = Date.now() + maxWaitMs;
+  while (Date.now() < deadline) {
+    const res = await axios.get(`${apiEndpoint}/api/aoi/analyze/result/${jobId}`, {
+      headers,
+    });
+    if (res.data.state === "done") return res.data.result;
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+  throw new Error(`Analysis job ${jobId} did not finish within ${maxWaitMs / 1000} s`);
+}
+
 const AOIMapper = () => {
   let apiEndpoint = "http://localhost:8000";
   let backend = "http://localhost:5000";
@@ -102,8 +122,8 @@ const AOIMapper = () => {
       setStatus(`Analyzing ${input.name}...`);
 
       try {
-        // First get the geographical analysis
-        const analysisRes = await axios.post(
+        // First queue the geographical analysis and wait for it to finish
+        const jobRes = await axios.post(
           `${apiEndpoint}/api/aoi/analyze`,
           input,
           {
@@ -112,14 +132,17 @@ const AOIMapper = () => {
             },
           }
         );
+        const analysis = await waitForAnalysis(apiEndpoint, jobRes.data.job_id, {
+          Authorization: `Bearer ${token}`,
+        });
 
         // Prepare data for DSS API
         const dssInput = {
-          total_area_sq_m: analysisRes.data.summary.total_area_sq_m,
-          agriculture_area_sq_m: analysisRes.data.summary.agriculture_area_sq_m || 0,
-          water_area_sq_m: analysisRes.data.summary.water_area_sq_m || 0,
-          forest_area_sq_m: analysisRes.data.summary.forest_area_sq_m || 0,
-          infrastructure_area_sq_m: analysisRes.data.summary.infrastructure_area_sq_m || 0
+          total_area_sq_m: analysis.summary.total_area_sq_m,
+          agriculture_area_sq_m: analysis.summary.agriculture_area_sq_m || 0,
+          water_area_sq_m: analysis.summary.water_area_sq_m || 0,
+          forest_area_sq_m: analysis.summary.forest_area_sq_m || 0,
+          infrastructure_area_sq_m: analysis.summary.infrastructure_area_sq_m || 0
         };
 
         // Get scheme recommendations
@@ -135,7 +158,7 @@ const AOIMapper = () => {
 
         // Return combined data
         return {
-          ...analysisRes.data,
+          ...analysis,
           schemes: dssRes.data
         };
       } catch (err) {